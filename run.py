@@ -8,38 +8,12 @@ import os
 import sys
 import asyncio
 import logging
+import importlib.util
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-def setup_logging():
-    """Setup logging configuration."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('bot.log'),
-            logging.StreamHandler()
-        ]
-    )
-
-def check_requirements():
-    """Check if all required packages are installed."""
-    required_packages = ['telethon', 'python-dotenv']
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
-    
-    if missing_packages:
-        print(f"❌ Missing required packages: {', '.join(missing_packages)}")
-        print("Please install them using: pip install -r requirements.txt")
-        return False
-    
-    return True
+from logging_setup import setup_logging
 
 def check_env_file():
     """Check if .env file exists and has required variables."""
@@ -57,12 +31,12 @@ def check_env_file():
         'ADMIN_USER_ID'
     ]
     
-    from dotenv import load_dotenv
-    load_dotenv(env_file)
+    from config import load_env
+    env = load_env(env_file)
     
     missing_vars = []
     for var in required_vars:
-        if not os.getenv(var):
+        if not env.get(var):
             missing_vars.append(var)
     
     if missing_vars:
@@ -79,17 +53,20 @@ async def main():
     # Setup logging
     setup_logging()
     
-    # Check requirements
-    if not check_requirements():
+    # Check dependencies without importing them (the bot loads them lazily)
+    missing = [name for name in ('dotenv', 'telethon') if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"❌ Missing dependencies: {', '.join(missing)}. Run: pip install -r requirements.txt")
         sys.exit(1)
     
+    from main import main as bot_main
+    
     # Check environment configuration
     if not check_env_file():
         sys.exit(1)
     
     try:
-        # Import and run the bot
-        from main import main as bot_main
+        # Run the bot
         await bot_main()
         
     except KeyboardInterrupt:
@@ -102,7 +79,7 @@ async def main():
 if __name__ == "__main__":
     # Handle Windows event loop policy
     if sys.platform.startswith('win'):
-        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
     
     # Run the bot
     asyncio.run(main())
@@ -4,39 +4,155 @@ Admin Controls and Monitoring
 Handles admin commands, status monitoring, and bot management features.
 """
 
+from __future__ import annotations
+
 import logging
 import asyncio
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
-import json
+from pathlib import Path
+from typing import Any
+from dataclasses import dataclass
+
+# Use orjson for stats serialization when installed, stdlib json otherwise
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    import json
+    _dumps = json.dumps
 
 logger = logging.getLogger(__name__)
 
+# Admin message templates (built once at import)
+_STATUS_TEMPLATE = """
+🤖 **Bot Status Report**
+
+📊 **Current Status:** {status}
+⏱️ **Uptime:** {uptime}
+📈 **Messages Forwarded:** {forwarded}
+⏭️ **Messages Skipped:** {skipped}
+❌ **Errors:** {errors}
+
+📅 **Started:** {started}
+🕐 **Last Message:** {last_message}
+
+Use /stats for detailed statistics.
+""".strip()
+
+_DETAILED_STATS_TEMPLATE = """
+📊 **Detailed Bot Statistics**
+
+**📈 Performance Metrics:**
+• Messages Forwarded: {forwarded}
+• Messages Skipped: {skipped}
+• Success Rate: {success_rate:.1f}%
+• Error Count: {errors}
+
+**⏱️ Time Information:**
+• Bot Started: {started}
+• Uptime: {uptime}
+• Last Activity: {last_activity}
+
+**🔧 Configuration:**
+• Source Group: {source_group_id}
+• Destination Group: {destination_group_id}
+• Channel Link: {channel_link}
+• Reference Text: {reference_text}
+
+**📝 Recent Activity:**
+• Commands Executed: {commands}
+• Recent Errors: {recent_errors}
+
+Use /logs to view recent errors.
+""".strip()
+
+_HELP_MESSAGE = """
+🤖 **Telegram Forward Bot - Admin Commands**
+
+**🔄 Control Commands:**
+/start - Start message forwarding
+/stop - Stop message forwarding
+/test - Test bot connection and configuration
+
+**📊 Monitoring Commands:**
+/status - View current bot status
+/stats - View detailed statistics
+/logs - View recent error logs
+/config - View bot configuration
+
+**⚙️ Configuration Commands:**
+/update_reference <text> - Update reference text
+/update_channel <link> - Update channel link
+/reset_stats - Reset bot statistics
+
+**ℹ️ Information Commands:**
+/help - Show this help message
+
+**📋 Features:**
+✅ Auto-forward messages with link removal
+✅ Add custom reference text to messages
+✅ Attach channel button to forwarded messages
+✅ Real-time status monitoring
+✅ Comprehensive error logging
+✅ Admin-only access control
+
+**📞 Support:**
+If you encounter any issues, check the logs with /logs command.
+""".strip()
+
 @dataclass
 class BotStats:
     """Data class for bot statistics."""
     messages_forwarded: int = 0
     messages_skipped: int = 0
     errors_count: int = 0
-    start_time: datetime = None
-    last_message_time: datetime = None
+    start_time: datetime | None = None
+    last_message_time: datetime | None = None
     is_active: bool = False
-    uptime_seconds: int = 0
     
     def __post_init__(self):
         if self.start_time is None:
             self.start_time = datetime.now()
+        self._format_start_time()
+    
+    def _format_start_time(self):
+        """Cache formatted start_time strings (start_time only changes on reset)."""
+        self.started_str = self.start_time.strftime('%Y-%m-%d %H:%M:%S')
+        self._start_time_iso = self.start_time.isoformat()
+    
+    def reset(self):
+        """Reset counters and start time in place, keeping the forwarding state."""
+        self.messages_forwarded = 0
+        self.messages_skipped = 0
+        self.errors_count = 0
+        self.start_time = datetime.now()
+        self.last_message_time = None
+        self._format_start_time()
+    
+    @property
+    def uptime_seconds(self) -> int:
+        """Seconds elapsed since start_time, computed on read."""
+        return int((datetime.now() - self.start_time).total_seconds())
     
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self) -> dict[str, Any]:
         """Convert stats to dictionary for JSON serialization."""
-        data = asdict(self)
-        # Convert datetime objects to ISO format strings
-        if self.start_time:
-            data['start_time'] = self.start_time.isoformat()
-        if self.last_message_time:
-            data['last_message_time'] = self.last_message_time.isoformat()
-        return data
+        # Built by hand rather than with asdict(), which deep-copies every field
+        return {
+            'messages_forwarded': self.messages_forwarded,
+            'messages_skipped': self.messages_skipped,
+            'errors_count': self.errors_count,
+            'start_time': self._start_time_iso if self.start_time else None,
+            'last_message_time': self.last_message_time.isoformat() if self.last_message_time else None,
+            'is_active': self.is_active,
+            'uptime_seconds': self.uptime_seconds
+        }
+    
+    def to_json(self) -> str:
+        """Serialize stats to a JSON string."""
+        return _dumps(self.to_dict())
 
 class AdminManager:
     """Manages admin commands and bot monitoring."""
@@ -52,8 +168,12 @@ class AdminManager:
         self.admin_user_id = admin_user_id
         self.bot_instance = bot_instance
         self.stats = BotStats()
-        self.command_history: List[Dict[str, Any]] = []
-        self.error_log: List[Dict[str, Any]] = []
+        # Bounded logs: oldest entries drop off in O(1) (last 100 commands, last 50 errors)
+        self.command_history: deque = deque(maxlen=100)
+        self.error_log: deque = deque(maxlen=50)
+        
+        # Set when stats change; the background flush task persists them
+        self._stats_dirty = False
         
         # Admin commands mapping
         self.commands = {
@@ -116,23 +236,18 @@ class AdminManager:
             'args': args,
             'user_id': user_id
         })
-        
-        # Keep only last 100 commands
-        if len(self.command_history) > 100:
-            self.command_history = self.command_history[-100:]
     
     def log_error(self, error_type: str, error_message: str):
         """Log error for admin monitoring."""
+        now = datetime.now()
         self.error_log.append({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
+            'ts': now.timestamp(),
             'type': error_type,
             'message': error_message
         })
         self.stats.errors_count += 1
-        
-        # Keep only last 50 errors
-        if len(self.error_log) > 50:
-            self.error_log = self.error_log[-50:]
+        self._stats_dirty = True
     
     def update_stats(self, action: str):
         """Update bot statistics."""
@@ -142,16 +257,39 @@ class AdminManager:
         elif action == 'message_skipped':
             self.stats.messages_skipped += 1
         
-        # Update uptime
-        if self.stats.start_time:
-            self.stats.uptime_seconds = int((datetime.now() - self.stats.start_time).total_seconds())
+        self._stats_dirty = True
+    
+    def save_stats(self, path: str):
+        """Write current statistics to a JSON file."""
+        Path(path).write_text(self.stats.to_json(), encoding='utf-8')
+    
+    async def flush_stats_periodically(self, path: str, interval: float = 5):
+        """
+        Persist statistics in the background, coalescing updates into one write per interval.
+        
+        Args:
+            path: Path of the JSON stats file
+            interval: Seconds between flushes
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if not self._stats_dirty:
+                continue
+            
+            # Clear before writing so updates made during the write are flushed next time
+            self._stats_dirty = False
+            try:
+                await loop.run_in_executor(None, self.save_stats, path)
+            except Exception as e:
+                logger.error(f"Failed to save stats: {e}")
     
     # Admin Commands Implementation
     
     async def cmd_start_forwarding(self, event, args: str):
         """Start message forwarding."""
         if self.bot_instance:
-            self.bot_instance.is_forwarding = True
+            self.bot_instance.set_forwarding(True)
             self.stats.is_active = True
             await event.reply("✅ **Message forwarding started!**\n\nBot is now actively forwarding messages from source to destination group.")
             logger.info("Message forwarding started by admin")
@@ -161,7 +299,7 @@ class AdminManager:
     async def cmd_stop_forwarding(self, event, args: str):
         """Stop message forwarding."""
         if self.bot_instance:
-            self.bot_instance.is_forwarding = False
+            self.bot_instance.set_forwarding(False)
             self.stats.is_active = False
             await event.reply("⏹️ **Message forwarding stopped!**\n\nBot has stopped forwarding messages.")
             logger.info("Message forwarding stopped by admin")
@@ -170,23 +308,15 @@ class AdminManager:
     
     async def cmd_get_status(self, event, args: str):
         """Get current bot status."""
-        status = "🟢 **ACTIVE**" if self.stats.is_active else "🔴 **INACTIVE**"
-        uptime = str(timedelta(seconds=self.stats.uptime_seconds))
-        
-        status_message = f"""
-🤖 **Bot Status Report**
-
-📊 **Current Status:** {status}
-⏱️ **Uptime:** {uptime}
-📈 **Messages Forwarded:** {self.stats.messages_forwarded}
-⏭️ **Messages Skipped:** {self.stats.messages_skipped}
-❌ **Errors:** {self.stats.errors_count}
-
-📅 **Started:** {self.stats.start_time.strftime('%Y-%m-%d %H:%M:%S') if self.stats.start_time else 'N/A'}
-🕐 **Last Message:** {self.stats.last_message_time.strftime('%Y-%m-%d %H:%M:%S') if self.stats.last_message_time else 'N/A'}
-
-Use /stats for detailed statistics.
-        """.strip()
+        status_message = _STATUS_TEMPLATE.format_map({
+            'status': "🟢 **ACTIVE**" if self.stats.is_active else "🔴 **INACTIVE**",
+            'uptime': str(timedelta(seconds=self.stats.uptime_seconds)),
+            'forwarded': self.stats.messages_forwarded,
+            'skipped': self.stats.messages_skipped,
+            'errors': self.stats.errors_count,
+            'started': self.stats.started_str,
+            'last_message': self.stats.last_message_time.strftime('%Y-%m-%d %H:%M:%S') if self.stats.last_message_time else 'N/A'
+        })
         
         await event.reply(status_message)
     
@@ -197,73 +327,29 @@ Use /stats for detailed statistics.
             return
         
         config = self.bot_instance.config if hasattr(self.bot_instance, 'config') else None
+        recent_cutoff = (datetime.now() - timedelta(hours=24)).timestamp()
         
-        stats_message = f"""
-📊 **Detailed Bot Statistics**
-
-**📈 Performance Metrics:**
-• Messages Forwarded: {self.stats.messages_forwarded}
-• Messages Skipped: {self.stats.messages_skipped}
-• Success Rate: {(self.stats.messages_forwarded / max(self.stats.messages_forwarded + self.stats.messages_skipped, 1) * 100):.1f}%
-• Error Count: {self.stats.errors_count}
-
-**⏱️ Time Information:**
-• Bot Started: {self.stats.start_time.strftime('%Y-%m-%d %H:%M:%S') if self.stats.start_time else 'N/A'}
-• Uptime: {str(timedelta(seconds=self.stats.uptime_seconds))}
-• Last Activity: {self.stats.last_message_time.strftime('%Y-%m-%d %H:%M:%S') if self.stats.last_message_time else 'N/A'}
-
-**🔧 Configuration:**
-• Source Group: {config.source_group_id if config else 'N/A'}
-• Destination Group: {config.destination_group_id if config else 'N/A'}
-• Channel Link: {config.channel_link if config else 'N/A'}
-• Reference Text: {config.reference_text if config else 'N/A'}
-
-**📝 Recent Activity:**
-• Commands Executed: {len(self.command_history)}
-• Recent Errors: {len([e for e in self.error_log if datetime.fromisoformat(e['timestamp']) > datetime.now() - timedelta(hours=24)])}
-
-Use /logs to view recent errors.
-        """.strip()
+        stats_message = _DETAILED_STATS_TEMPLATE.format_map({
+            'forwarded': self.stats.messages_forwarded,
+            'skipped': self.stats.messages_skipped,
+            'success_rate': calculate_success_rate(self.stats.messages_forwarded, self.stats.messages_skipped),
+            'errors': self.stats.errors_count,
+            'started': self.stats.started_str,
+            'uptime': str(timedelta(seconds=self.stats.uptime_seconds)),
+            'last_activity': self.stats.last_message_time.strftime('%Y-%m-%d %H:%M:%S') if self.stats.last_message_time else 'N/A',
+            'source_group_id': config.source_group_id if config else 'N/A',
+            'destination_group_id': config.destination_group_id if config else 'N/A',
+            'channel_link': config.channel_link if config else 'N/A',
+            'reference_text': config.reference_text if config else 'N/A',
+            'commands': len(self.command_history),
+            'recent_errors': sum(1 for e in self.error_log if e['ts'] > recent_cutoff)
+        })
         
         await event.reply(stats_message)
     
     async def cmd_get_help(self, event, args: str):
         """Show help message with all available commands."""
-        help_message = """
-🤖 **Telegram Forward Bot - Admin Commands**
-
-**🔄 Control Commands:**
-/start - Start message forwarding
-/stop - Stop message forwarding
-/test - Test bot connection and configuration
-
-**📊 Monitoring Commands:**
-/status - View current bot status
-/stats - View detailed statistics
-/logs - View recent error logs
-/config - View bot configuration
-
-**⚙️ Configuration Commands:**
-/update_reference <text> - Update reference text
-/update_channel <link> - Update channel link
-/reset_stats - Reset bot statistics
-
-**ℹ️ Information Commands:**
-/help - Show this help message
-
-**📋 Features:**
-✅ Auto-forward messages with link removal
-✅ Add custom reference text to messages
-✅ Attach channel button to forwarded messages
-✅ Real-time status monitoring
-✅ Comprehensive error logging
-✅ Admin-only access control
-
-**📞 Support:**
-If you encounter any issues, check the logs with /logs command.
-        """.strip()
-        
-        await event.reply(help_message)
+        await event.reply(_HELP_MESSAGE)
     
     async def cmd_get_config(self, event, args: str):
         """Show current bot configuration."""
@@ -293,6 +379,7 @@ If you encounter any issues, check the logs with /logs command.
 • Max Message Length: {config.max_message_length}
 • Forward Media: {'✅' if config.forward_media else '❌'}
 • Log Level: {config.log_level}
+• Stats File: {config.stats_file}
 
 **👤 Admin Settings:**
 • Admin User ID: {config.admin_user_id}
@@ -308,7 +395,7 @@ Use /update_reference or /update_channel to modify settings.
             await event.reply("✅ No recent errors found!")
             return
         
-        recent_errors = self.error_log[-10:]  # Last 10 errors
+        recent_errors = list(self.error_log)[-10:]  # Last 10 errors
         
         logs_message = "🚨 **Recent Error Logs:**\n\n"
         for i, error in enumerate(recent_errors, 1):
@@ -322,7 +409,8 @@ Use /update_reference or /update_channel to modify settings.
     
     async def cmd_reset_stats(self, event, args: str):
         """Reset bot statistics."""
-        self.stats = BotStats()
+        self.stats.reset()
+        self._stats_dirty = True
         self.command_history.clear()
         self.error_log.clear()
         
@@ -337,25 +425,30 @@ Use /update_reference or /update_channel to modify settings.
         if self.bot_instance:
             test_results.append("✅ Bot instance: OK")
             
-            # Test client connection
-            try:
-                me = await self.bot_instance.client.get_me()
+            # Run the connection and group access checks concurrently
+            client = self.bot_instance.client
+            config = self.bot_instance.config
+            me, source_entity, dest_entity = await asyncio.gather(
+                client.get_me(),
+                client.get_entity(config.source_group_id),
+                client.get_entity(config.destination_group_id),
+                return_exceptions=True
+            )
+            
+            if isinstance(me, Exception):
+                test_results.append(f"❌ Telegram connection: {str(me)}")
+            else:
                 test_results.append(f"✅ Telegram connection: OK (@{me.username})")
-            except Exception as e:
-                test_results.append(f"❌ Telegram connection: {str(e)}")
             
-            # Test group access
-            try:
-                source_entity = await self.bot_instance.client.get_entity(self.bot_instance.config.source_group_id)
+            if isinstance(source_entity, Exception):
+                test_results.append(f"❌ Source group access: {str(source_entity)}")
+            else:
                 test_results.append(f"✅ Source group access: OK ({source_entity.title})")
-            except Exception as e:
-                test_results.append(f"❌ Source group access: {str(e)}")
             
-            try:
-                dest_entity = await self.bot_instance.client.get_entity(self.bot_instance.config.destination_group_id)
+            if isinstance(dest_entity, Exception):
+                test_results.append(f"❌ Destination group access: {str(dest_entity)}")
+            else:
                 test_results.append(f"✅ Destination group access: OK ({dest_entity.title})")
-            except Exception as e:
-                test_results.append(f"❌ Destination group access: {str(e)}")
         else:
             test_results.append("❌ Bot instance: Not available")
         
@@ -370,6 +463,8 @@ Use /update_reference or /update_channel to modify settings.
         
         if self.bot_instance and hasattr(self.bot_instance, 'config'):
             self.bot_instance.config.update_reference_text(args)
+            if hasattr(self.bot_instance, 'message_processor'):
+                self.bot_instance.message_processor.update_reference_text(args)
             await event.reply(f"✅ **Reference text updated!**\n\nNew reference: {args}")
         else:
             await event.reply("❌ Bot configuration not available")
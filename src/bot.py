@@ -4,15 +4,16 @@ Telegram Auto-Forward Bot
 A bot that forwards messages from one group to another with link removal and custom modifications.
 """
 
-import os
+from __future__ import annotations
+
 import re
 import logging
 import asyncio
-from typing import Optional, Dict, Any
 from datetime import datetime
-from dotenv import load_dotenv
 
+from dotenv import find_dotenv
 from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError
 from telethon.tl.types import (
     MessageEntityUrl, MessageEntityTextUrl, MessageEntityMention,
     MessageEntityMentionName, KeyboardButtonUrl
@@ -20,43 +21,95 @@ from telethon.tl.types import (
 from telethon.tl.functions.messages import SendMessageRequest
 from telethon.tl.types import ReplyInlineMarkup, KeyboardButtonRow
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+from config import load_env
+from logging_setup import setup_logging
+
 logger = logging.getLogger(__name__)
 
+# Precompiled link patterns (fused so each message is scanned once)
+_URL_RE = re.compile(r'(?:https?://\S+)|(?:(?:t\.me|telegram\.me)/\S+)')
+_MENTION_RE = re.compile(r'@[A-Za-z0-9_]+')
+_WS_RE = re.compile(r'\s+')
+
+# Sender worker batching: up to this many concurrent sends, collected within the timeout
+_SEND_BATCH_SIZE = 8
+_SEND_BATCH_TIMEOUT = 0.05
+# Seconds shutdown waits for queued messages to be sent before dropping them
+_SEND_DRAIN_TIMEOUT = 10
+
+# Admin message templates (built once at import)
+_STATUS_TEMPLATE = """
+📊 **Bot Status Report**
+
+🔄 Forwarding Status: {status}
+📈 Messages Forwarded: {count}
+⏱️ Uptime: {uptime}
+📥 Source Group ID: {source_group_id}
+📤 Destination Group ID: {destination_group_id}
+🔗 Channel Link: {channel_link}
+📝 Reference Text: {reference_text}
+
+Last Updated: {now}
+""".strip()
+
+_HELP_MESSAGE = """
+🤖 **Admin Commands**
+
+/start_forwarding - Start message forwarding
+/stop_forwarding - Stop message forwarding  
+/status - View bot status and statistics
+/help - Show this help message
+
+**Features:**
+✅ Auto-forward messages from source to destination group
+✅ Remove all links from messages
+✅ Add custom reference text
+✅ Attach channel button to each message
+✅ Admin-only controls
+✅ Real-time status monitoring
+
+**Note:** Only authorized admin can use these commands.
+""".strip()
+
+def _strip_mentions(text: str) -> str:
+    """Remove @username mentions, skipping the regex when the text has no '@'."""
+    if text.find('@') < 0:
+        return text
+    return _MENTION_RE.sub('', text)
+
 class TelegramForwardBot:
     """Main bot class for handling message forwarding and processing."""
     
     def __init__(self):
         """Initialize the bot with configuration from environment variables."""
-        self.api_id = int(os.getenv('API_ID', '0'))
-        self.api_hash = os.getenv('API_HASH', '')
-        self.phone_number = os.getenv('PHONE_NUMBER', '')
-        self.session_name = os.getenv('SESSION_NAME', 'telegram_forward_bot')
+        # Locate .env by searching upward from this file, as load_dotenv() did
+        env = load_env(find_dotenv())
+        
+        self.api_id = int(env.get('API_ID', '0'))
+        self.api_hash = env.get('API_HASH', '')
+        self.phone_number = env.get('PHONE_NUMBER', '')
+        self.session_name = env.get('SESSION_NAME', 'telegram_forward_bot')
         
         # Group/Channel IDs
-        self.source_group_id = int(os.getenv('SOURCE_GROUP_ID', '0'))
-        self.destination_group_id = int(os.getenv('DESTINATION_GROUP_ID', '0'))
+        self.source_group_id = int(env.get('SOURCE_GROUP_ID', '0'))
+        self.destination_group_id = int(env.get('DESTINATION_GROUP_ID', '0'))
         
         # Bot configuration
-        self.channel_link = os.getenv('CHANNEL_LINK', 'https://t.me/your_channel')
-        self.reference_text = os.getenv('REFERENCE_TEXT', '📢 Forwarded by Bot')
-        self.admin_user_id = int(os.getenv('ADMIN_USER_ID', '0'))
+        self.channel_link = env.get('CHANNEL_LINK', 'https://t.me/your_channel')
+        self.reference_text = env.get('REFERENCE_TEXT', '📢 Forwarded by Bot')
+        self.admin_user_id = int(env.get('ADMIN_USER_ID', '0'))
+        self._channel_buttons = self._build_channel_buttons()
         
         # Bot state
         self.is_forwarding = False
         self.message_count = 0
         self.start_time = datetime.now()
+        self._me_id: int | None = None
+        self._source_peer = None
+        self._dest_peer = None
+        self._source_event = None
+        self._send_queue: asyncio.Queue | None = None
+        self._sender_task: asyncio.Task | None = None
         
         # Initialize Telegram client
         self.client = TelegramClient(self.session_name, self.api_id, self.api_hash)
@@ -71,8 +124,17 @@ class TelegramForwardBot:
             
             # Verify bot is connected
             me = await self.client.get_me()
+            self._me_id = me.id
             logger.info(f"Bot running as: {me.first_name} (@{me.username})")
             
+            # Resolve group peers once so events and sends don't look them up again
+            self._source_peer = await self.client.get_input_entity(self.source_group_id)
+            self._dest_peer = await self.client.get_input_entity(self.destination_group_id)
+            
+            # Start the sender worker that drains processed messages
+            self._send_queue = asyncio.Queue()
+            self._sender_task = asyncio.create_task(self._sender_worker())
+            
             # Register event handlers
             self.register_handlers()
             
@@ -86,24 +148,33 @@ class TelegramForwardBot:
     def register_handlers(self):
         """Register event handlers for the bot."""
         
-        # Handler for messages from source group
-        @self.client.on(events.NewMessage(chats=self.source_group_id))
-        async def handle_source_message(event):
-            if self.is_forwarding:
-                await self.process_and_forward_message(event)
+        # Source group handler is only installed while forwarding (see set_forwarding)
+        self._source_event = events.NewMessage(chats=self._source_peer)
         
         # Handler for admin commands
         @self.client.on(events.NewMessage(from_users=self.admin_user_id))
         async def handle_admin_command(event):
             await self.handle_admin_command(event)
     
+    def set_forwarding(self, enabled: bool):
+        """Install or remove the source group handler so idle events cost nothing."""
+        if enabled and not self.is_forwarding:
+            self.client.add_event_handler(self._handle_source_message, self._source_event)
+        elif not enabled and self.is_forwarding:
+            self.client.remove_event_handler(self._handle_source_message, self._source_event)
+        self.is_forwarding = enabled
+    
+    async def _handle_source_message(self, event):
+        """Handle a message from the source group."""
+        await self.process_and_forward_message(event)
+    
     async def process_and_forward_message(self, event):
         """Process and forward message from source to destination group."""
         try:
             original_message = event.message
             
-            # Skip if message is empty or from bot itself
-            if not original_message.text or original_message.from_id.user_id == (await self.client.get_me()).id:
+            # Skip if message is empty or from bot itself (channel posts have no from_id)
+            if not original_message.text or getattr(original_message.from_id, 'user_id', None) == self._me_id:
                 return
             
             # Process the message text
@@ -111,58 +182,100 @@ class TelegramForwardBot:
             processed_text = self.add_reference(processed_text)
             
             # Create inline keyboard with channel button
-            keyboard = self.create_channel_button()
+            keyboard = self._channel_buttons
             
-            # Send processed message to destination group
-            await self.client.send_message(
-                self.destination_group_id,
-                processed_text,
-                buttons=keyboard
-            )
-            
-            self.message_count += 1
-            logger.info(f"Message forwarded successfully. Total: {self.message_count}")
+            # Queue processed message for the sender worker
+            await self._send_queue.put((processed_text, keyboard))
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
     
+    async def _sender_worker(self):
+        """Drain the send queue, sending small batches of messages concurrently."""
+        while True:
+            batch = [await self._send_queue.get()]
+            
+            # Collect whatever else arrives shortly after, up to the batch size
+            while len(batch) < _SEND_BATCH_SIZE:
+                try:
+                    batch.append(await asyncio.wait_for(self._send_queue.get(), timeout=_SEND_BATCH_TIMEOUT))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self._send_batch(batch)
+            finally:
+                for _ in batch:
+                    self._send_queue.task_done()
+    
+    async def stop_sender(self):
+        """Stop forwarding, give queued messages a bounded time to send, then stop the worker."""
+        self.set_forwarding(False)
+        try:
+            await asyncio.wait_for(self._send_queue.join(), _SEND_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Dropping {self._send_queue.qsize()} queued message(s) and the batch in flight "
+                f"after waiting {_SEND_DRAIN_TIMEOUT}s"
+            )
+        self._sender_task.cancel()
+    
+    async def _send_batch(self, batch):
+        """Send a batch of (text, buttons) items, retrying flood-limited ones after the wait."""
+        pending = batch
+        while pending:
+            results = await asyncio.gather(
+                *[self.client.send_message(self._dest_peer, text, buttons=buttons)
+                  for text, buttons in pending],
+                return_exceptions=True
+            )
+            
+            retry = []
+            flood_wait = 0
+            for item, result in zip(pending, results):
+                if isinstance(result, FloodWaitError):
+                    retry.append(item)
+                    flood_wait = max(flood_wait, result.seconds)
+                elif isinstance(result, Exception):
+                    logger.error(f"Error forwarding message: {result}")
+                else:
+                    self.message_count += 1
+                    logger.info(f"Message forwarded successfully. Total: {self.message_count}")
+            
+            if retry:
+                logger.warning(f"Flood wait: retrying {len(retry)} message(s) in {flood_wait}s")
+                await asyncio.sleep(flood_wait)
+            pending = retry
+    
     def remove_links(self, text: str) -> str:
         """Remove all types of links from the message text."""
-        # Remove HTTP/HTTPS URLs
-        text = re.sub(r'https?://[^\s]+', '', text)
-        
-        # Remove Telegram links (t.me, telegram.me)
-        text = re.sub(r'(?:https?://)?(?:t\.me|telegram\.me)/[^\s]+', '', text)
-        
-        # Remove @username mentions that could be channels/groups
-        text = re.sub(r'@[a-zA-Z0-9_]+', '', text)
-        
-        # Clean up extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return _WS_RE.sub(' ', _strip_mentions(_URL_RE.sub('', text))).strip()
     
     def add_reference(self, text: str) -> str:
         """Add custom reference to the message."""
         return f"{text}\n\n{self.reference_text}"
     
-    def create_channel_button(self):
-        """Create inline keyboard with channel button."""
+    def _build_channel_buttons(self):
+        """Build inline keyboard with channel button."""
         return [
             [KeyboardButtonUrl("🔗 Join Our Channel", self.channel_link)]
         ]
     
+    def create_channel_button(self):
+        """Get the cached inline keyboard with channel button."""
+        return self._channel_buttons
+    
     async def handle_admin_command(self, event):
         """Handle admin commands."""
         command = event.message.text.lower().strip()
         
         if command == '/start_forwarding':
-            self.is_forwarding = True
+            self.set_forwarding(True)
             await event.reply("✅ Message forwarding started!")
             logger.info("Message forwarding started by admin")
             
         elif command == '/stop_forwarding':
-            self.is_forwarding = False
+            self.set_forwarding(False)
             await event.reply("⏹️ Message forwarding stopped!")
             logger.info("Message forwarding stopped by admin")
             
@@ -177,45 +290,28 @@ class TelegramForwardBot:
     def get_status_message(self) -> str:
         """Get current bot status message."""
         uptime = datetime.now() - self.start_time
-        status = "🟢 Active" if self.is_forwarding else "🔴 Inactive"
         
-        return f"""
-📊 **Bot Status Report**
-
-🔄 Forwarding Status: {status}
-📈 Messages Forwarded: {self.message_count}
-⏱️ Uptime: {str(uptime).split('.')[0]}
-📥 Source Group ID: {self.source_group_id}
-📤 Destination Group ID: {self.destination_group_id}
-🔗 Channel Link: {self.channel_link}
-📝 Reference Text: {self.reference_text}
-
-Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        """.strip()
+        return _STATUS_TEMPLATE.format_map({
+            'status': "🟢 Active" if self.is_forwarding else "🔴 Inactive",
+            'count': self.message_count,
+            'uptime': str(uptime).split('.')[0],
+            'source_group_id': self.source_group_id,
+            'destination_group_id': self.destination_group_id,
+            'channel_link': self.channel_link,
+            'reference_text': self.reference_text,
+            'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
     
     def get_help_message(self) -> str:
         """Get help message with available commands."""
-        return """
-🤖 **Admin Commands**
-
-/start_forwarding - Start message forwarding
-/stop_forwarding - Stop message forwarding  
-/status - View bot status and statistics
-/help - Show this help message
-
-**Features:**
-✅ Auto-forward messages from source to destination group
-✅ Remove all links from messages
-✅ Add custom reference text
-✅ Attach channel button to each message
-✅ Admin-only controls
-✅ Real-time status monitoring
-
-**Note:** Only authorized admin can use these commands.
-        """.strip()
+        return _HELP_MESSAGE
 
 async def main():
     """Main function to run the bot."""
+    # Configure logging here rather than at import time, so importing this module
+    # doesn't attach a second bot.log handler when logging is already set up
+    setup_logging()
+    
     bot = TelegramForwardBot()
     
     try:
@@ -225,6 +321,8 @@ async def main():
     except Exception as e:
         logger.error(f"Bot crashed: {e}")
     finally:
+        if bot._sender_task:
+            await bot.stop_sender()
         await bot.client.disconnect()
         logger.info("Bot disconnected")
 
@@ -6,14 +6,40 @@ Handles loading and validation of environment variables and bot settings.
 
 import os
 import logging
+from functools import lru_cache
 from typing import Optional, Dict, Any
-from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=None)
+def load_env(env_file: str = '.env') -> Dict[str, str]:
+    """
+    Parse the .env file once and overlay the process environment on top.
+    
+    Args:
+        env_file: Path to the .env file
+        
+    Returns:
+        Dictionary of environment values (process environment wins, as with load_dotenv)
+    """
+    from dotenv import dotenv_values
+    
+    values = {key: value for key, value in dotenv_values(env_file).items() if value is not None}
+    values.update(os.environ)
+    return values
+
 class BotConfig:
     """Configuration manager for the Telegram bot."""
     
+    __slots__ = (
+        'api_id', 'api_hash', 'phone_number', 'session_name',
+        'source_group_id', 'destination_group_id',
+        'channel_link', 'reference_text',
+        'admin_user_id',
+        'min_message_length', 'max_message_length', 'forward_media', 'log_level',
+        'stats_file', 'stats_flush_interval',
+    )
+    
     def __init__(self, env_file: str = '.env'):
         """
         Initialize configuration from environment variables.
@@ -21,47 +47,49 @@ class BotConfig:
         Args:
             env_file: Path to the .env file
         """
-        # Load environment variables
-        load_dotenv(env_file)
+        # Load environment variables once into a plain dict
+        env = load_env(env_file)
         
         # Telegram API Configuration
-        self.api_id = self._get_int_env('API_ID')
-        self.api_hash = self._get_env('API_HASH')
-        self.phone_number = self._get_env('PHONE_NUMBER')
-        self.session_name = self._get_env('SESSION_NAME', 'telegram_forward_bot')
+        self.api_id = self._get_int_env(env, 'API_ID')
+        self.api_hash = self._get_env(env, 'API_HASH')
+        self.phone_number = self._get_env(env, 'PHONE_NUMBER')
+        self.session_name = self._get_env(env, 'SESSION_NAME', 'telegram_forward_bot')
         
         # Group/Channel Configuration
-        self.source_group_id = self._get_int_env('SOURCE_GROUP_ID')
-        self.destination_group_id = self._get_int_env('DESTINATION_GROUP_ID')
+        self.source_group_id = self._get_int_env(env, 'SOURCE_GROUP_ID')
+        self.destination_group_id = self._get_int_env(env, 'DESTINATION_GROUP_ID')
         
         # Bot Customization
-        self.channel_link = self._get_env('CHANNEL_LINK', 'https://t.me/your_channel')
-        self.reference_text = self._get_env('REFERENCE_TEXT', '📢 Forwarded by Bot')
+        self.channel_link = self._get_env(env, 'CHANNEL_LINK', 'https://t.me/your_channel')
+        self.reference_text = self._get_env(env, 'REFERENCE_TEXT', '📢 Forwarded by Bot')
         
         # Admin Configuration
-        self.admin_user_id = self._get_int_env('ADMIN_USER_ID')
+        self.admin_user_id = self._get_int_env(env, 'ADMIN_USER_ID')
         
         # Optional Settings
-        self.min_message_length = self._get_int_env('MIN_MESSAGE_LENGTH', 10)
-        self.max_message_length = self._get_int_env('MAX_MESSAGE_LENGTH', 4000)
-        self.forward_media = self._get_bool_env('FORWARD_MEDIA', True)
-        self.log_level = self._get_env('LOG_LEVEL', 'INFO')
+        self.min_message_length = self._get_int_env(env, 'MIN_MESSAGE_LENGTH', 10)
+        self.max_message_length = self._get_int_env(env, 'MAX_MESSAGE_LENGTH', 4000)
+        self.forward_media = self._get_bool_env(env, 'FORWARD_MEDIA', True)
+        self.log_level = self._get_env(env, 'LOG_LEVEL', 'INFO')
+        self.stats_file = self._get_env(env, 'STATS_FILE', 'stats.json')
+        self.stats_flush_interval = self._get_int_env(env, 'STATS_FLUSH_INTERVAL', 5)
         
         # Validate required configuration
         self._validate_config()
         
         logger.info("Configuration loaded successfully")
     
-    def _get_env(self, key: str, default: Optional[str] = None) -> str:
+    def _get_env(self, env: Dict[str, str], key: str, default: Optional[str] = None) -> str:
         """Get environment variable with optional default."""
-        value = os.getenv(key, default)
+        value = env.get(key, default)
         if value is None:
             raise ValueError(f"Required environment variable {key} is not set")
         return value
     
-    def _get_int_env(self, key: str, default: Optional[int] = None) -> int:
+    def _get_int_env(self, env: Dict[str, str], key: str, default: Optional[int] = None) -> int:
         """Get integer environment variable with optional default."""
-        value = os.getenv(key)
+        value = env.get(key)
         if value is None:
             if default is not None:
                 return default
@@ -72,9 +100,9 @@ class BotConfig:
         except ValueError:
             raise ValueError(f"Environment variable {key} must be an integer, got: {value}")
     
-    def _get_bool_env(self, key: str, default: bool = False) -> bool:
+    def _get_bool_env(self, env: Dict[str, str], key: str, default: bool = False) -> bool:
         """Get boolean environment variable with default."""
-        value = os.getenv(key, str(default)).lower()
+        value = env.get(key, str(default)).lower()
         return value in ('true', '1', 'yes', 'on')
     
     def _validate_config(self):
@@ -102,10 +130,12 @@ class BotConfig:
         if self.source_group_id == self.destination_group_id:
             errors.append("SOURCE_GROUP_ID and DESTINATION_GROUP_ID cannot be the same")
         
-        if errors:
-            error_message = "Configuration validation failed:\n" + "\n".join(f"- {error}" for error in errors)
-            logger.error(error_message)
-            raise ValueError(error_message)
+        if not errors:
+            return
+        
+        error_message = "Configuration validation failed:\n- " + "\n- ".join(errors)
+        logger.error(error_message)
+        raise ValueError(error_message)
     
     def get_config_summary(self) -> Dict[str, Any]:
         """Get a summary of the current configuration (excluding sensitive data)."""
@@ -120,6 +150,8 @@ class BotConfig:
             'max_message_length': self.max_message_length,
             'forward_media': self.forward_media,
             'log_level': self.log_level,
+            'stats_file': self.stats_file,
+            'stats_flush_interval': self.stats_flush_interval,
             'api_configured': bool(self.api_id and self.api_hash),
             'phone_configured': bool(self.phone_number)
         }
@@ -134,19 +166,17 @@ class BotConfig:
         self.channel_link = new_link
         logger.info(f"Channel link updated to: {new_link}")
 
-# Global configuration instance
-config = None
+@lru_cache(maxsize=None)
+def _get_config(env_file: str) -> BotConfig:
+    """Build and cache the configuration for an env file (always called positionally)."""
+    return BotConfig(env_file)
 
 def get_config(env_file: str = '.env') -> BotConfig:
-    """Get the global configuration instance."""
-    global config
-    if config is None:
-        config = BotConfig(env_file)
-    return config
+    """Get the shared configuration instance for an env file."""
+    return _get_config(env_file)
 
 def reload_config(env_file: str = '.env') -> BotConfig:
     """Reload the configuration from environment variables."""
-    global config
-    config = BotConfig(env_file)
-    return config
-
+    load_env.cache_clear()
+    _get_config.cache_clear()
+    return _get_config(env_file)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Logging Setup
+Configures non-blocking logging: records are queued and written to file/console by a background thread.
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+def setup_logging(level: int = logging.INFO, log_file: str = 'bot.log') -> QueueListener:
+    """
+    Route log records through a queue so disk and console writes happen off the event loop.
+    
+    Only the first call installs handlers; later calls return the running listener.
+    
+    Args:
+        level: Root logger level
+        log_file: Path of the log file
+    
+    Returns:
+        The running queue listener
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+    
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler(log_file)
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    _queue_handler = QueueHandler(log_queue)
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    
+    # Flush anything still queued when the process exits
+    atexit.register(stop_logging)
+    
+    return _listener
+
+def stop_logging():
+    """Flush queued records and stop the background listener."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    
+    _listener = None
+    _queue_handler = None
@@ -14,29 +14,58 @@ from typing import Optional
 # Add src directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from telethon import TelegramClient, events
-from telethon.tl.types import KeyboardButtonUrl
-
 from config import get_config
 from message_processor import MessageProcessor
 from admin import AdminManager
+from logging_setup import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (queued, so file writes don't block the event loop)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Forward queue: bounded backlog, and up to this many concurrent sends per batch
+_FORWARD_QUEUE_SIZE = 256
+_FORWARD_BATCH_SIZE = 8
+# Seconds shutdown waits for queued messages to be sent before dropping them
+_FORWARD_DRAIN_TIMEOUT = 10
+
+# Admin notification templates (built once at import)
+_STARTUP_TEMPLATE = """
+🤖 **Bot Started Successfully!**
+
+✅ Connected as: {name}
+📅 Started at: {now}
+🔄 Forwarding Status: {status}
+
+**Configuration:**
+📥 Source Group: {source}
+📤 Destination Group: {destination}
+🔗 Channel Link: {channel_link}
+📝 Reference: {reference}
+
+Use /help to see available commands.
+""".strip()
+
+_SHUTDOWN_TEMPLATE = """
+🤖 **Bot Shutting Down**
+
+📊 **Final Statistics:**
+• Messages Forwarded: {forwarded}
+• Messages Skipped: {skipped}
+• Errors: {errors}
+• Uptime: {uptime} seconds
+
+Bot stopped at: {now}
+""".strip()
+
 class TelegramForwardBot:
     """Enhanced Telegram bot for message forwarding with admin controls."""
     
     def __init__(self):
         """Initialize the bot with all components."""
+        # Telethon is imported where it's first needed, keeping `import main` cheap
+        from telethon import TelegramClient
+        
         try:
             # Load configuration
             self.config = get_config()
@@ -47,6 +76,14 @@ class TelegramForwardBot:
             
             # Bot state
             self.is_forwarding = False
+            self._source_event = None
+            self._stats_task: Optional[asyncio.Task] = None
+            self._forward_queue: Optional[asyncio.Queue] = None
+            self._forward_task: Optional[asyncio.Task] = None
+            self._me_id: Optional[int] = None
+            self._me_first_name: Optional[str] = None
+            self._cached_keyboard: Optional[list] = None
+            self._cached_keyboard_link: Optional[str] = None
             self.client: Optional[TelegramClient] = None
             
             # Initialize Telegram client
@@ -71,17 +108,30 @@ class TelegramForwardBot:
             
             # Verify connection
             me = await self.client.get_me()
+            self._me_id = me.id
+            self._me_first_name = me.first_name
             logger.info(f"Bot running as: {me.first_name} (@{me.username})")
             
             # Verify group access
             await self.verify_group_access()
             
+            # Start the worker that sends queued messages to the destination group
+            self._forward_queue = asyncio.Queue(maxsize=_FORWARD_QUEUE_SIZE)
+            self._forward_task = asyncio.create_task(self._forward_worker())
+            
             # Register event handlers
             self.register_handlers()
             
             # Send startup notification to admin
             await self.send_startup_notification()
             
+            # Persist statistics in the background
+            self._stats_task = asyncio.create_task(
+                self.admin_manager.flush_stats_periodically(
+                    self.config.stats_file, self.config.stats_flush_interval
+                )
+            )
+            
             logger.info("Bot is ready and listening for messages...")
             
             # Keep the bot running
@@ -109,12 +159,10 @@ class TelegramForwardBot:
     
     def register_handlers(self):
         """Register all event handlers."""
+        from telethon import events
         
-        # Handler for messages from source group
-        @self.client.on(events.NewMessage(chats=self.config.source_group_id))
-        async def handle_source_message(event):
-            if self.is_forwarding:
-                await self.process_and_forward_message(event)
+        # Source group handler is only installed while forwarding (see set_forwarding)
+        self._source_event = events.NewMessage(chats=self.config.source_group_id)
         
         # Handler for admin commands (from admin user)
         @self.client.on(events.NewMessage(from_users=self.config.admin_user_id))
@@ -130,19 +178,30 @@ class TelegramForwardBot:
         
         logger.info("Event handlers registered successfully")
     
+    def set_forwarding(self, enabled: bool):
+        """Install or remove the source group handler so idle events cost nothing."""
+        if enabled and not self.is_forwarding:
+            self.client.add_event_handler(self._handle_source_message, self._source_event)
+        elif not enabled and self.is_forwarding:
+            self.client.remove_event_handler(self._handle_source_message, self._source_event)
+        self.is_forwarding = enabled
+    
+    async def _handle_source_message(self, event):
+        """Handle a message from the source group."""
+        await self.process_and_forward_message(event)
+    
     async def process_and_forward_message(self, event):
         """Process and forward message from source to destination group."""
         try:
             original_message = event.message
             
             # Skip messages from self
-            me = await self.client.get_me()
-            if original_message.from_id and original_message.from_id.user_id == me.id:
+            if original_message.from_id and getattr(original_message.from_id, 'user_id', None) == self._me_id:
                 return
             
             # Check if message should be forwarded
-            should_forward, reason = self.message_processor.should_forward_message(
-                original_message, self.config.min_message_length
+            should_forward, reason, stripped_text = self.message_processor.should_forward_message(
+                original_message, self.config.min_message_length, self.config.max_message_length
             )
             
             if not should_forward:
@@ -150,8 +209,12 @@ class TelegramForwardBot:
                 self.admin_manager.update_stats('message_skipped')
                 return
             
-            # Process the message
-            processed_text = await self.process_message_content(original_message)
+            # Media without a caption only carries the reference, so skip the text pipeline
+            if not original_message.text:
+                processed_text = self.message_processor.reference_text
+            else:
+                # Process the message, reusing the link-stripped text from the check above
+                processed_text = await self.process_message_content(original_message, stripped_text)
             
             if not processed_text:
                 logger.debug("Message skipped: No content after processing")
@@ -161,38 +224,69 @@ class TelegramForwardBot:
             # Create inline keyboard with channel button
             keyboard = self.create_channel_button()
             
-            # Forward media if present and enabled
-            if original_message.media and self.config.forward_media:
-                await self.client.send_message(
-                    self.config.destination_group_id,
-                    processed_text,
-                    file=original_message.media,
-                    buttons=keyboard
-                )
-            else:
-                # Send text only
-                await self.client.send_message(
-                    self.config.destination_group_id,
-                    processed_text,
-                    buttons=keyboard
-                )
-            
-            # Update statistics
-            self.admin_manager.update_stats('message_forwarded')
+            # Forward media if present and enabled, otherwise send text only
+            media = original_message.media if self.config.forward_media else None
             
-            logger.info(f"Message forwarded successfully. Total: {self.admin_manager.stats.messages_forwarded}")
+            # Queue for the forward worker
+            await self._forward_queue.put((processed_text, media, keyboard))
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             self.admin_manager.log_error("Message processing error", str(e))
     
-    async def process_message_content(self, message) -> str:
+    async def _forward_worker(self):
+        """Send queued messages, batching whatever is already waiting into concurrent sends."""
+        from telethon.errors import FloodWaitError
+        
+        while True:
+            batch = [await self._forward_queue.get()]
+            while not self._forward_queue.empty() and len(batch) < _FORWARD_BATCH_SIZE:
+                batch.append(self._forward_queue.get_nowait())
+            
+            try:
+                await self._send_batch(batch, FloodWaitError)
+            finally:
+                for _ in batch:
+                    self._forward_queue.task_done()
+    
+    async def _send_batch(self, batch, flood_wait_error):
+        """Send a batch of (text, media, buttons) items, retrying flood-limited ones after the wait."""
+        pending = batch
+        while pending:
+            results = await asyncio.gather(
+                *[self.client.send_message(self.config.destination_group_id, text, file=media, buttons=buttons)
+                  for text, media, buttons in pending],
+                return_exceptions=True
+            )
+            
+            retry = []
+            flood_wait = 0
+            for item, result in zip(pending, results):
+                if isinstance(result, flood_wait_error):
+                    retry.append(item)
+                    flood_wait = max(flood_wait, result.seconds)
+                elif isinstance(result, Exception):
+                    logger.error(f"Error forwarding message: {result}")
+                    self.admin_manager.log_error("Message forwarding error", str(result))
+                else:
+                    self.admin_manager.update_stats('message_forwarded')
+                    logger.info(f"Message forwarded successfully. Total: {self.admin_manager.stats.messages_forwarded}")
+            
+            if retry:
+                logger.warning(f"Flood wait: retrying {len(retry)} message(s) in {flood_wait}s")
+                await asyncio.sleep(flood_wait)
+            pending = retry
+    
+    async def process_message_content(self, message, pre_stripped_text: Optional[str] = None) -> str:
         """Process message content (remove links, add reference, etc.)."""
         try:
-            text = message.text or ""
-            
-            # Remove links
-            processed_text = self.message_processor.remove_all_links(text)
+            # Remove links (unless already done while checking the message)
+            if pre_stripped_text is not None:
+                processed_text = pre_stripped_text
+            else:
+                # Bound regex work: output is truncated to the limit anyway, 2x leaves slack
+                text = (message.text or "")[:self.config.max_message_length * 2]
+                processed_text = self.message_processor.remove_all_links(text)
             
             # Clean formatting
             processed_text = self.message_processor.clean_text_formatting(processed_text)
@@ -211,29 +305,28 @@ class TelegramForwardBot:
             return ""
     
     def create_channel_button(self):
-        """Create inline keyboard with channel button."""
-        return [
-            [KeyboardButtonUrl("🔗 Join Our Channel", self.config.channel_link)]
-        ]
+        """Get inline keyboard with channel button, rebuilt only when the channel link changes."""
+        if self._cached_keyboard is None or self._cached_keyboard_link != self.config.channel_link:
+            from telethon.tl.types import KeyboardButtonUrl
+            
+            self._cached_keyboard_link = self.config.channel_link
+            self._cached_keyboard = [
+                [KeyboardButtonUrl("🔗 Join Our Channel", self._cached_keyboard_link)]
+            ]
+        return self._cached_keyboard
     
     async def send_startup_notification(self):
         """Send startup notification to admin."""
         try:
-            startup_message = f"""
-🤖 **Bot Started Successfully!**
-
-✅ Connected as: {(await self.client.get_me()).first_name}
-📅 Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-🔄 Forwarding Status: {'Active' if self.is_forwarding else 'Inactive'}
-
-**Configuration:**
-📥 Source Group: {self.config.source_group_id}
-📤 Destination Group: {self.config.destination_group_id}
-🔗 Channel Link: {self.config.channel_link}
-📝 Reference: {self.config.reference_text}
-
-Use /help to see available commands.
-            """.strip()
+            startup_message = _STARTUP_TEMPLATE.format_map({
+                'name': self._me_first_name,
+                'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'status': 'Active' if self.is_forwarding else 'Inactive',
+                'source': self.config.source_group_id,
+                'destination': self.config.destination_group_id,
+                'channel_link': self.config.channel_link,
+                'reference': self.config.reference_text,
+            })
             
             await self.client.send_message(self.config.admin_user_id, startup_message)
             
@@ -245,24 +338,41 @@ Use /help to see available commands.
         try:
             logger.info("Shutting down bot...")
             
+            # Stop taking new messages and give queued ones a bounded time to send
+            if self._forward_task:
+                self.set_forwarding(False)
+                try:
+                    await asyncio.wait_for(self._forward_queue.join(), _FORWARD_DRAIN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Dropping {self._forward_queue.qsize()} queued message(s) and the batch in flight "
+                        f"after waiting {_FORWARD_DRAIN_TIMEOUT}s"
+                    )
+                self._forward_task.cancel()
+            
             # Send shutdown notification to admin
             try:
-                shutdown_message = f"""
-🤖 **Bot Shutting Down**
-
-📊 **Final Statistics:**
-• Messages Forwarded: {self.admin_manager.stats.messages_forwarded}
-• Messages Skipped: {self.admin_manager.stats.messages_skipped}
-• Errors: {self.admin_manager.stats.errors_count}
-• Uptime: {self.admin_manager.stats.uptime_seconds} seconds
-
-Bot stopped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-                """.strip()
+                stats = self.admin_manager.stats
+                shutdown_message = _SHUTDOWN_TEMPLATE.format_map({
+                    'forwarded': stats.messages_forwarded,
+                    'skipped': stats.messages_skipped,
+                    'errors': stats.errors_count,
+                    'uptime': stats.uptime_seconds,
+                    'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                })
                 
                 await self.client.send_message(self.config.admin_user_id, shutdown_message)
             except:
                 pass  # Don't fail shutdown if notification fails
             
+            # Stop background stats flushing and write the final statistics
+            if self._stats_task:
+                self._stats_task.cancel()
+            try:
+                self.admin_manager.save_stats(self.config.stats_file)
+            except Exception as e:
+                logger.error(f"Failed to save stats: {e}")
+            
             # Disconnect client
             if self.client:
                 await self.client.disconnect()
@@ -295,7 +405,7 @@ async def main():
 if __name__ == "__main__":
     # Handle Windows event loop policy
     if sys.platform.startswith('win'):
-        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
     
     # Run the bot
     asyncio.run(main())
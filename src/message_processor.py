@@ -11,9 +11,29 @@ from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# Runs of four or more emojis, collapsed by clean_text_formatting (no capture group)
+_EMOJI_RUN_RE = re.compile(r'[\U0001F1E0-\U0001F1FF\U0001F300-\U0001F64F\U0001F680-\U0001F6FF]{4,}')
+
+# Telethon media class name -> media type (keyed by name so this module needn't import Telethon)
+_MEDIA_TYPE_MAP = {
+    'MessageMediaPhoto': 'photo',
+    'MessageMediaDocument': 'document',
+}
+
+def _collapse_emoji_runs(text: str) -> str:
+    """Keep at most three consecutive emojis from each run."""
+    return _EMOJI_RUN_RE.sub(lambda match: match.group()[:3], text)
+
 class MessageProcessor:
     """Utility class for processing and modifying message content."""
     
+    __slots__ = (
+        'reference_text', '_reference_suffix',
+        '_url_links_re', '_ref_links_re', '_ws_re',
+        '_url_count_re', '_mention_count_re',
+        '_clean_re',
+    )
+    
     def __init__(self, reference_text: str = "📢 Forwarded by Bot"):
         """
         Initialize the message processor.
@@ -22,24 +42,37 @@ class MessageProcessor:
             reference_text: Custom reference text to add to messages
         """
         self.reference_text = reference_text
+        self._reference_suffix = f"\n\n{reference_text}"
         
-        # Compile regex patterns for better performance
-        self.url_patterns = [
-            re.compile(r'https?://[^\s]+', re.IGNORECASE),  # HTTP/HTTPS URLs
-            re.compile(r'www\.[^\s]+', re.IGNORECASE),      # www URLs
-            re.compile(r'[a-zA-Z0-9-]+\.[a-zA-Z]{2,}[^\s]*', re.IGNORECASE)  # Domain URLs
+        # URL patterns: standard URLs, domains and Telegram links
+        url_patterns = [
+            r'https?://[^\s]+',                                  # HTTP/HTTPS URLs
+            r'www\.[^\s]+',                                      # www URLs
+            r'[a-zA-Z0-9-]{1,63}\.[a-zA-Z]{2,63}[^\s]*',         # Domain URLs (label-bounded)
+            r'(?:https?://)?(?:t\.me|telegram\.me)/[^\s]+',       # Telegram links
+            r'tg://[^\s]+',                                      # Telegram deep links
         ]
         
-        self.telegram_patterns = [
-            re.compile(r'(?:https?://)?(?:t\.me|telegram\.me)/[^\s]+', re.IGNORECASE),
-            re.compile(r'@[a-zA-Z0-9_]+', re.IGNORECASE),  # Username mentions
-            re.compile(r'tg://[^\s]+', re.IGNORECASE)      # Telegram deep links
+        # Reference patterns: username mentions and channel/group references
+        ref_patterns = [
+            r'@[a-zA-Z0-9_]+',                                   # Username mentions
+            r'(?:join|channel|group)[\s]*:[\s]*@?[a-zA-Z0-9_]+',  # Channel/group references
+            r'(?:telegram|tg)[\s]*(?:channel|group|chat)[\s]*:?[\s]*@?[a-zA-Z0-9_]+'
         ]
         
-        self.channel_patterns = [
-            re.compile(r'(?:join|channel|group)[\s]*:[\s]*@?[a-zA-Z0-9_]+', re.IGNORECASE),
-            re.compile(r'(?:telegram|tg)[\s]*(?:channel|group|chat)[\s]*:?[\s]*@?[a-zA-Z0-9_]+', re.IGNORECASE)
-        ]
+        # Compile each group once as a single alternation. URLs are removed first, so a
+        # mention or "join:" in front of a URL can't consume its scheme and leave the rest
+        self._url_links_re = re.compile("|".join(f"(?:{p})" for p in url_patterns), re.IGNORECASE)
+        self._ref_links_re = re.compile("|".join(f"(?:{p})" for p in ref_patterns), re.IGNORECASE)
+        # Whitespace runs and non-space whitespace only, so clean text yields no matches
+        self._ws_re = re.compile(r'\s{2,}|[^\S ]')
+        
+        # Patterns for counting removed links/mentions in get_processing_stats
+        self._url_count_re = re.compile(r'https?://[^\s]+')
+        self._mention_count_re = re.compile(r'@[a-zA-Z0-9_]+')
+        
+        # Formatting cleanup: one fused pass for punctuation, caps and whitespace
+        self._clean_re = re.compile(r'(!{4,})|(\?{4,})|(\.{4,})|([A-Z]{4,})|(\s{2,}|[^\S ])')
     
     def remove_all_links(self, text: str) -> str:
         """
@@ -54,26 +87,12 @@ class MessageProcessor:
         if not text:
             return text
             
-        processed_text = text
-        
-        # Remove standard URLs
-        for pattern in self.url_patterns:
-            processed_text = pattern.sub('', processed_text)
-        
-        # Remove Telegram-specific links
-        for pattern in self.telegram_patterns:
-            processed_text = pattern.sub('', processed_text)
-        
-        # Remove channel/group references
-        for pattern in self.channel_patterns:
-            processed_text = pattern.sub('', processed_text)
+        # Remove URLs, then mentions and channel references, in two passes
+        processed_text = self._url_links_re.sub('', text)
+        processed_text = self._ref_links_re.sub('', processed_text)
         
         # Clean up extra whitespace and line breaks
-        processed_text = re.sub(r'\s+', ' ', processed_text)
-        processed_text = re.sub(r'\n\s*\n', '\n', processed_text)
-        processed_text = processed_text.strip()
-        
-        return processed_text
+        return self._ws_re.sub(' ', processed_text).strip()
     
     def add_custom_reference(self, text: str) -> str:
         """
@@ -88,7 +107,12 @@ class MessageProcessor:
         if not text:
             return self.reference_text
             
-        return f"{text}\n\n{self.reference_text}"
+        return text + self._reference_suffix
+    
+    def update_reference_text(self, new_reference: str):
+        """Update the reference text and its cached suffix."""
+        self.reference_text = new_reference
+        self._reference_suffix = f"\n\n{new_reference}"
     
     def extract_media_info(self, message) -> dict:
         """
@@ -110,53 +134,66 @@ class MessageProcessor:
         if message.media:
             media_info['has_media'] = True
             
-            if hasattr(message.media, 'photo'):
-                media_info['media_type'] = 'photo'
-            elif hasattr(message.media, 'document'):
-                media_info['media_type'] = 'document'
-                if hasattr(message.media.document, 'size'):
-                    media_info['file_size'] = message.media.document.size
-                if hasattr(message.media.document, 'attributes'):
-                    for attr in message.media.document.attributes:
+            media_type = _MEDIA_TYPE_MAP.get(type(message.media).__name__)
+            media_info['media_type'] = media_type
+            
+            if media_type == 'document':
+                document = message.media.document
+                if hasattr(document, 'size'):
+                    media_info['file_size'] = document.size
+                if hasattr(document, 'attributes'):
+                    for attr in document.attributes:
                         if hasattr(attr, 'file_name'):
                             media_info['file_name'] = attr.file_name
-            elif hasattr(message.media, 'video'):
-                media_info['media_type'] = 'video'
-            elif hasattr(message.media, 'audio'):
-                media_info['media_type'] = 'audio'
         
         return media_info
     
-    def should_forward_message(self, message, min_length: int = 10) -> Tuple[bool, str]:
+    def should_forward_message(self, message, min_length: int = 10,
+                               max_length: Optional[int] = None) -> Tuple[bool, str, Optional[str]]:
         """
         Determine if a message should be forwarded based on various criteria.
         
         Args:
             message: Telegram message object
             min_length: Minimum text length for forwarding
+            max_length: Maximum forwarded length; text beyond twice this is not scanned for links
             
         Returns:
-            Tuple of (should_forward: bool, reason: str)
+            Tuple of (should_forward: bool, reason: str, stripped_text: Optional[str]),
+            where stripped_text is the message text with links removed (None if not computed)
         """
+        # Cheap checks first, so rejected messages never reach link stripping
+        
+        # Skip messages from bots (if sender info is available)
+        if hasattr(message, 'sender') and message.sender and hasattr(message.sender, 'bot'):
+            if message.sender.bot:
+                return False, "Message from bot", None
+        
         # Skip empty messages
         if not message.text and not message.media:
-            return False, "Empty message"
+            return False, "Empty message", None
         
         # Skip very short messages (likely spam)
         if message.text and len(message.text.strip()) < min_length:
-            return False, f"Message too short (< {min_length} characters)"
+            return False, f"Message too short (< {min_length} characters)", None
+        
+        # Output is truncated to max_length anyway, so scanning at most 2x that bounds
+        # the regex work (only very link-heavy texts can come out shorter)
+        text = message.text or ""
+        truncated = bool(max_length) and len(text) > max_length * 2
+        if truncated:
+            text = text[:max_length * 2]
         
         # Skip messages that are only links
-        text_without_links = self.remove_all_links(message.text or "")
+        text_without_links = self.remove_all_links(text)
         if message.text and len(text_without_links.strip()) < 5:
-            return False, "Message contains only links"
-        
-        # Skip messages from bots (if sender info is available)
-        if hasattr(message, 'sender') and message.sender and hasattr(message.sender, 'bot'):
-            if message.sender.bot:
-                return False, "Message from bot"
+            # A link-heavy prefix is inconclusive; the rest may still have text
+            if truncated:
+                text_without_links = self.remove_all_links(message.text)
+            if len(text_without_links.strip()) < 5:
+                return False, "Message contains only links", text_without_links
         
-        return True, "Message approved for forwarding"
+        return True, "Message approved for forwarding", text_without_links
     
     def clean_text_formatting(self, text: str) -> str:
         """
@@ -172,21 +209,23 @@ class MessageProcessor:
             return text
         
         # Remove excessive emojis (more than 3 consecutive)
-        text = re.sub(r'([\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]){4,}', r'\1\1\1', text)
+        text = _collapse_emoji_runs(text)
         
-        # Remove excessive punctuation
-        text = re.sub(r'[!]{4,}', '!!!', text)
-        text = re.sub(r'[?]{4,}', '???', text)
-        text = re.sub(r'[.]{4,}', '...', text)
-        
-        # Remove excessive capitalization (more than 3 consecutive caps)
-        text = re.sub(r'[A-Z]{4,}', lambda m: m.group()[:3], text)
-        
-        # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        
-        return text
+        # Collapse excessive punctuation and capitalization, and clean up whitespace, in one pass
+        return self._clean_re.sub(self._clean_sub, text).strip()
+    
+    @staticmethod
+    def _clean_sub(match) -> str:
+        """Replacement for each run matched by the fused cleanup pattern."""
+        if match.group(1):
+            return '!!!'
+        if match.group(2):
+            return '???'
+        if match.group(3):
+            return '...'
+        if match.group(4):
+            return match.group(4)[:3]
+        return ' '
     
     def get_processing_stats(self, original_text: str, processed_text: str) -> dict:
         """
@@ -202,21 +241,27 @@ class MessageProcessor:
         return {
             'original_length': len(original_text) if original_text else 0,
             'processed_length': len(processed_text) if processed_text else 0,
-            'links_removed': len(re.findall(r'https?://[^\s]+', original_text or "")),
-            'mentions_removed': len(re.findall(r'@[a-zA-Z0-9_]+', original_text or "")),
+            'links_removed': sum(1 for _ in self._url_count_re.finditer(original_text or "")),
+            'mentions_removed': sum(1 for _ in self._mention_count_re.finditer(original_text or "")),
             'reduction_percentage': round(
                 ((len(original_text or "") - len(processed_text or "")) / max(len(original_text or ""), 1)) * 100, 2
             )
         }
 
 # Utility functions for standalone use
+_default_processor: Optional[MessageProcessor] = None
+
+def _get_default_processor() -> MessageProcessor:
+    """Get the shared processor, compiling its patterns on first use."""
+    global _default_processor
+    if _default_processor is None:
+        _default_processor = MessageProcessor()
+    return _default_processor
+
 def quick_remove_links(text: str) -> str:
     """Quick function to remove links from text."""
-    processor = MessageProcessor()
-    return processor.remove_all_links(text)
+    return _get_default_processor().remove_all_links(text)
 
 def quick_add_reference(text: str, reference: str = "📢 Forwarded by Bot") -> str:
     """Quick function to add reference to text."""
-    processor = MessageProcessor(reference)
-    return processor.add_custom_reference(text)
-
+    return f"{text}\n\n{reference}" if text else reference